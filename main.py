@@ -1,55 +1,138 @@
 import asyncio
 import logging
+import logging.handlers
 import os
+import pickle
+import threading
 from src.services.monitoring import MonitoringService
-import yaml
-from dotenv import load_dotenv
+from src.validators.site_validator import _safe_load
 
-def setup_logging():
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler('logs/app.log'),
-            logging.StreamHandler()
-        ]
-    )
+class BufferedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Rotating file handler that batches writes and flushes periodically.
+    
+    Records are written through a large file buffer and flushed every
+    flush_interval seconds; ERROR and above are flushed immediately.
+    """
+    
+    def __init__(self, filename: str, *args, buffer_size: int = 65536,
+                 flush_interval: float = 30.0, **kwargs):
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self._bytes_written = os.path.getsize(filename) if os.path.exists(filename) else 0
+        self._flush_timer = None
+        self._closing = False
+        super().__init__(filename, *args, **kwargs)
+        self._schedule_flush()
+    
+    def _open(self):
+        return open(self.baseFilename, self.mode, buffering=self.buffer_size,
+                    encoding=self.encoding, errors=self.errors)
+    
+    def shouldRollover(self, record) -> bool:
+        # Track size ourselves; the base implementation calls stream.tell(), which flushes the buffer
+        if self.stream is None:
+            self.stream = self._open()
+        if self.maxBytes <= 0:
+            return False
+        size = len(self.format(record)) + len(self.terminator)
+        if self._bytes_written and self._bytes_written + size >= self.maxBytes:
+            self._bytes_written = size
+            return True
+        self._bytes_written += size
+        return False
+    
+    def emit(self, record):
+        super().emit(record)
+        if record.levelno >= logging.ERROR:
+            self.flush_buffer()
+    
+    def flush(self):
+        # Called by StreamHandler.emit after every record; left to the timer instead
+        pass
+    
+    def flush_buffer(self):
+        """Write any buffered records to disk"""
+        self.acquire()
+        try:
+            if self.stream and hasattr(self.stream, 'flush'):
+                self.stream.flush()
+        finally:
+            self.release()
+    
+    def _schedule_flush(self):
+        self._flush_timer = threading.Timer(self.flush_interval, self._periodic_flush)
+        self._flush_timer.daemon = True
+        self._flush_timer.start()
+    
+    def _periodic_flush(self):
+        if self._closing:
+            return
+        self.flush_buffer()
+        self._schedule_flush()
+    
+    def close(self):
+        self._closing = True
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+        self.flush_buffer()
+        super().close()
+
+def _parse_config_file(config_path: str) -> dict:
+    """Parse a YAML config file, reusing a pickled copy while the file is unchanged"""
+    mtime_ns = os.stat(config_path).st_mtime_ns
+    env_name = os.path.basename(os.path.dirname(config_path))
+    cache_path = f'data/cache/config.{env_name}.{mtime_ns}.pkl'
+    
+    try:
+        with open(cache_path, 'rb') as file:
+            return pickle.load(file)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        pass
+    
+    with open(config_path, 'r') as file:
+        config = _safe_load(file)
+    
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(cache_path, 'wb') as file:
+            pickle.dump(config, file, protocol=pickle.HIGHEST_PROTOCOL)
+    except OSError:
+        pass  # Caching is best-effort
+    
+    return config
 
 def load_config():
+    from dotenv import load_dotenv  # Only needed once, at startup
+    
     # Load environment variables from .env file
     load_dotenv()
     
     env = os.getenv('ENVIRONMENT', 'development')
     config_path = f'config/{env}/config.yaml'
-    
-    with open(config_path, 'r') as file:
-        config = yaml.safe_load(file)
+    config = _parse_config_file(config_path)
     
     # Replace environment variables in config
-    config['api']['sunsynk']['username'] = os.getenv('SUNSYNK_USERNAME')
-    config['api']['sunsynk']['password'] = os.getenv('SUNSYNK_PASSWORD')
-    config['api']['google_sheets']['sheet_id'] = os.getenv('GOOGLE_SHEETS_ID')
-    
-    if not all([
-        config['api']['sunsynk']['username'],
-        config['api']['sunsynk']['password'],
-        config['api']['google_sheets']['sheet_id']
-    ]):
+    username = os.getenv('SUNSYNK_USERNAME')
+    password = os.getenv('SUNSYNK_PASSWORD')
+    sheet_id = os.getenv('GOOGLE_SHEETS_ID')
+    
+    if not (username and password and sheet_id):
         raise ValueError("Missing required environment variables")
     
+    config['api']['sunsynk']['username'] = username
+    config['api']['sunsynk']['password'] = password
+    config['api']['google_sheets']['sheet_id'] = sheet_id
+    
     return config
 
 def setup_data_management():
     """Setup data management with rotation and size limits"""
-    import logging.handlers
-    import os
-    
     # Create directories if they don't exist
     for dir_path in ['logs', 'data/cache', 'data/raw', 'data/processed']:
         os.makedirs(dir_path, exist_ok=True)
     
     # Setup rotating file handler for logs
-    log_handler = logging.handlers.RotatingFileHandler(
+    log_handler = BufferedRotatingFileHandler(
         'logs/app.log',
         maxBytes=5_000_000,  # 5MB
         backupCount=3
@@ -63,7 +146,7 @@ def setup_data_management():
     )
 
 async def main():
-    setup_logging()
+    setup_data_management()
     logger = logging.getLogger(__name__)
     
     try:
@@ -75,4 +158,10 @@ async def main():
         raise
 
 if __name__ == "__main__":
+    # Use the libuv-based event loop when it is installed (not available on Windows)
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
     asyncio.run(main())
\ No newline at end of file
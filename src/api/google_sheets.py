@@ -1,13 +1,32 @@
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
+import asyncio
 import logging
 import os
-from typing import Dict, List, Any
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+SCOPES = ('https://www.googleapis.com/auth/spreadsheets',)
+
+# Google client libraries are heavy to import, so they are loaded only when needed
+@lru_cache(maxsize=8)
+def _load_credentials(credentials_file: str, scopes: Tuple[str, ...]):
+    """Load service account credentials once per key file"""
+    from google.oauth2.service_account import Credentials
+    return Credentials.from_service_account_file(credentials_file, scopes=list(scopes))
+
+@lru_cache(maxsize=8)
+def _build_service(credentials):
+    """Build the Sheets API client once per credentials object"""
+    from googleapiclient.discovery import build
+    return build('sheets', 'v4', credentials=credentials)
+
 class GoogleSheetsPublisher:
+    MAX_ROWS = 1000  # Rows covered by each publish (adjust as needed)
+    COLUMN_COUNT = 11
+    LAST_COLUMN = 'K'
+
     def __init__(self, config: Dict):
         self.config = config
         self.sheet_id = config['api']['google_sheets']['sheet_id']
@@ -19,76 +38,75 @@ class GoogleSheetsPublisher:
             logger.error(f"Credentials file not found: {self.credentials_file}")
             raise FileNotFoundError(f"Google Sheets credentials file not found: {self.credentials_file}")
             
-        self.credentials = Credentials.from_service_account_file(
-            self.credentials_file,
-            scopes=['https://www.googleapis.com/auth/spreadsheets']
-        )
-        self.service = build('sheets', 'v4', credentials=self.credentials)
+        self.credentials = _load_credentials(self.credentials_file, SCOPES)
+        self.service = _build_service(self.credentials)
+        self._last_data_row: Optional[int] = None  # Last sheet row written by the previous publish
 
     def _extract_time(self, datetime_str: str) -> str:
-        """Extract time from datetime string"""
-        if datetime_str:
-            return datetime_str.split(" ")[1][:5]
-        return None
+        """Extract HH:MM from a fixed-width "YYYY-MM-DD HH:MM:SS" datetime string"""
+        return datetime_str[11:16] if datetime_str else None
+
+    def _prepare_data(self, analysis_results: Dict[str, Any]) -> List[List[Any]]:
+        """Build the header row and one row per site for the sheet"""
+        headers = ["Site Name", "Inverter SN", "Lowest SOC", "Lowest Time", "Current SOC",
+                   "Current Time", "V-bat", "V-BMS", "V-Diff", "Voltage Time", "Yesterday Max SOC"]
+        fmt2 = "{:.2f}".format
+        fmt_pct = "{:.1f}%".format
+        extract_time = self._extract_time
+        
+        # Size the matrix up front and fill it by index
+        values: List[Any] = [None] * (len(analysis_results) + 1)
+        values[0] = headers
+        for i, (site_name, site_data) in enumerate(analysis_results.items(), 1):
+            values[i] = [
+                site_name,
+                site_data.inverter_sn,
+                site_data.lowest_soc,
+                extract_time(site_data.lowest_soc_time),
+                site_data.current_soc,
+                extract_time(site_data.current_soc_time),
+                fmt2(site_data.current_v_bat) if site_data.current_v_bat is not None else 'N/A',
+                fmt2(site_data.current_vbms) if site_data.current_vbms is not None else 'N/A',
+                fmt2(site_data.max_v_diff) if site_data.max_v_diff is not None else 'N/A',
+                extract_time(site_data.current_voltage_time),
+                fmt_pct(site_data.yesterday_max_soc) if site_data.yesterday_max_soc is not None else 'N/A'
+            ]
+        return values
 
     async def publish(self, data: Dict[str, Any]) -> None:
         try:
-            # First clear the entire sheet
-            clear_range = f"{self.sheet_name}!A1:K1000"  # Adjust range as needed
-            self.service.spreadsheets().values().clear(
-                spreadsheetId=self.sheet_id,
-                range=clear_range
-            ).execute()
-            
             # Get current timestamp
             current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             
-            # Update the timestamp in A1
-            timestamp_range = f"{self.sheet_name}!A1:B1"
-            timestamp_value = [["Last Updated:", current_time]]
-            self.service.spreadsheets().values().update(
-                spreadsheetId=self.sheet_id,
-                range=timestamp_range,
-                valueInputOption="RAW",
-                body={"values": timestamp_value}
-            ).execute()
-            
-            # Define headers (starting from row 2)
-            headers = [
-                ["Site Name", "Inverter SN", "Lowest SOC", "Lowest Time", "Current SOC", 
-                 "Current Time", "V-bat", "V-BMS", "V-Diff", "Voltage Time", "Yesterday Max SOC"]
-            ]
+            # Timestamp row in A1, padded so stale cells in the row are blanked
+            timestamp_range = f"{self.sheet_name}!A1:{self.LAST_COLUMN}1"
+            timestamp_value = [["Last Updated:", current_time] + [""] * (self.COLUMN_COUNT - 2)]
             
-            # Create data rows
-            data_rows = []
-            for site_name, site_data in data.items():
-                status = 'OFFLINE' if site_data.current_soc == 'OFFLINE' else 'ONLINE'
-                row = [
-                    site_name,
-                    site_data.inverter_sn,
-                    site_data.lowest_soc,
-                    self._extract_time(site_data.lowest_soc_time),
-                    site_data.current_soc,
-                    self._extract_time(site_data.current_soc_time),
-                    f"{site_data.current_v_bat:.2f}" if site_data.current_v_bat is not None else 'N/A',
-                    f"{site_data.current_vbms:.2f}" if site_data.current_vbms is not None else 'N/A',
-                    f"{site_data.max_v_diff:.2f}" if site_data.max_v_diff is not None else 'N/A',
-                    self._extract_time(site_data.current_voltage_time),
-                    f"{site_data.yesterday_max_soc:.1f}%" if site_data.yesterday_max_soc is not None else 'N/A'
-                ]
-                data_rows.append(row)
+            # Headers and data rows (starting from row 2)
+            all_rows = self._prepare_data(data)
             
-            # Combine headers and data
-            all_rows = headers + data_rows
+            # Blank out only rows that held data on the previous publish; on the first
+            # publish the previous layout is unknown, so cover the full range
+            data_end_row = len(all_rows) + 1
+            previous_end_row = self._last_data_row if self._last_data_row is not None else self.MAX_ROWS
+            last_row = max(previous_end_row, data_end_row)
+            blank_rows = [[""] * self.COLUMN_COUNT for _ in range(last_row - data_end_row)]
             
-            # Update the data starting from row 2
-            data_range = f"{self.sheet_name}!A2:K{len(all_rows) + 1}"
-            self.service.spreadsheets().values().update(
+            # Write timestamp and data (starting from row 2) in a single request
+            data_range = f"{self.sheet_name}!A2:{self.LAST_COLUMN}{last_row}"
+            request = self.service.spreadsheets().values().batchUpdate(
                 spreadsheetId=self.sheet_id,
-                range=data_range,
-                valueInputOption="RAW",
-                body={"values": all_rows}
-            ).execute()
+                body={
+                    "valueInputOption": "RAW",
+                    "data": [
+                        {"range": timestamp_range, "values": timestamp_value},
+                        {"range": data_range, "values": all_rows + blank_rows}
+                    ]
+                }
+            )
+            # googleapiclient is synchronous; run the HTTP call off the event loop
+            await asyncio.to_thread(request.execute)
+            self._last_data_row = data_end_row
             
             logger.info("Data successfully published to Google Sheets")
             
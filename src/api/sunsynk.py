@@ -1,18 +1,71 @@
 import aiohttp
 import asyncio
+import json
+import random
 from aiolimiter import AsyncLimiter
 import logging
 from typing import Dict, Optional, Tuple, List
 
+try:
+    import orjson
+except ImportError:  # Fall back to the standard library
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
+# JSON codecs for request and response bodies, using orjson when it is installed
+json_loads = orjson.loads if orjson is not None else json.loads
+
+def json_dumps(obj) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj)
+
 class SunSynkAPI:
+    MAX_PLANT_PAGES = 14  # Pages requested when the API doesn't report a plant total
+    MAX_RATE_LIMIT = 20  # Requests per second across all SunSynk calls, whatever the config says
+
     def __init__(self, config: Dict):
         self.base_url = config['api']['sunsynk']['base_url']
-        self.rate_limit = AsyncLimiter(config['api']['sunsynk']['rate_limit'], 1)
+        rate_limit = config['api']['sunsynk']['rate_limit']
+        if rate_limit > self.MAX_RATE_LIMIT:
+            logger.warning(f"Configured rate_limit {rate_limit} exceeds {self.MAX_RATE_LIMIT}, capping it")
+            rate_limit = self.MAX_RATE_LIMIT
+        self.rate_limit = AsyncLimiter(rate_limit, 1)
         self.max_retries = config['api']['sunsynk']['max_retries']
         self.retry_delay = config['api']['sunsynk']['retry_delay']
+        self._session: Optional[aiohttp.ClientSession] = None
         
+    async def __aenter__(self) -> 'SunSynkAPI':
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    async def start(self) -> aiohttp.ClientSession:
+        """Create the shared keep-alive session if it isn't already open"""
+        if self._session is None or self._session.closed:
+            # Cap per-host connections, keep idle ones warm between fetch cycles and
+            # reap closed SSL transports that would otherwise linger
+            connector = aiohttp.TCPConnector(
+                ssl=False, limit=100, limit_per_host=20, keepalive_timeout=75,
+                ttl_dns_cache=300, enable_cleanup_closed=True
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=30),
+                headers={'accept': 'application/json'},
+                json_serialize=json_dumps
+            )
+        return self._session
+
+    async def close(self) -> None:
+        """Close the shared session and its pooled connections"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
     async def get_token(self, session: aiohttp.ClientSession, username: str, password: str) -> Tuple[Optional[str], Optional[int]]:
         """Reference to original token fetch logic"""
         # Reference to original implementation:
@@ -36,7 +89,7 @@ class SunSynkAPI:
         
         try:
             async with session.post(url, json=payload, headers=headers) as response:
-                data = await response.json()
+                data = await response.json(loads=json_loads)
                 if data['success'] and 'data' in data:
                     return data['data']['access_token'], data['data']['expires_in']
                 logger.error(f"Failed to acquire token. Error message: {data.get('msg', 'Unknown error')}")
@@ -58,19 +111,20 @@ class SunSynkAPI:
         }
         
         for attempt in range(self.max_retries):
+            # Only the request itself consumes rate-limit budget, not the backoff
             async with self.rate_limit:
                 try:
                     async with session.get(url, headers=headers) as response:
                         if response.status == 200:
-                            return await response.json()
+                            return await response.json(loads=json_loads)
                         logger.error(f"Failed to fetch plant list for page {page}. Status: {response.status}")
                 except Exception as e:
                     logger.error(f"Exception in get_plants for page {page}: {e}")
-                
-                if attempt < self.max_retries - 1:
-                    delay = (attempt + 1) * 2
-                    logger.info(f"Retrying page {page} in {delay} seconds...")
-                    await asyncio.sleep(delay)
+            
+            if attempt < self.max_retries - 1:
+                delay = min(self.retry_delay * 2 ** attempt, 30) + random.random()
+                logger.info(f"Retrying page {page} in {delay:.1f} seconds...")
+                await asyncio.sleep(delay)
         
         return None
 
@@ -89,7 +143,7 @@ class SunSynkAPI:
         async with self.rate_limit:
             try:
                 async with session.get(url, params=params, headers={'Authorization': f'Bearer {access_token}'}) as response:
-                    data = await response.json()
+                    data = await response.json(loads=json_loads)
                     if 'data' in data and 'infos' in data['data']:
                         return {
                             inverter['sn']: inverter.get('equipMode', None) 
@@ -101,29 +155,58 @@ class SunSynkAPI:
                 logger.error(f"Failed to fetch inverters for site {site_id}. Error: {e}")
                 return None
 
+    def _plant_page_count(self, first_page: Optional[Dict], page_size: int) -> int:
+        """Number of plant pages to request, based on the total reported with the first page"""
+        total = (first_page.get('data') or {}).get('total') if isinstance(first_page, dict) else None
+        if total is None:
+            logger.warning(f"Plant total not reported, requesting up to {self.MAX_PLANT_PAGES} pages")
+            return self.MAX_PLANT_PAGES
+        return (int(total) + page_size - 1) // page_size
+
     async def get_all_sites(self, session: aiohttp.ClientSession, access_token: str) -> Dict:
         """Fetch all sites data including inverter information"""
         all_sites_data = {}
-        total_pages = 14
+        page_size = 14
+        page_sites: Dict[int, List[Tuple[str, int, asyncio.Task]]] = {}
+        page_slots = asyncio.Semaphore(8)  # Plant page requests in flight at once
 
-        # Fetch all plants first
-        plant_tasks = [self.get_plants(session, access_token, page) 
-                      for page in range(1, total_pages + 1)]
-        plants_info_list = await asyncio.gather(*plant_tasks)
-        
-        # Process plants and fetch inverters
-        for plants_info in plants_info_list:
+        def schedule_inverters(page: int, plants_info: Optional[Dict]) -> None:
+            # Start inverter lookups for a plant page as soon as that page arrives
             if plants_info and isinstance(plants_info, dict) and 'data' in plants_info and 'infos' in plants_info['data']:
-                for plant in plants_info['data']['infos']:
-                    site_name = plant['name']
-                    site_id = plant['id']
-                    
-                    # Fetch inverters for this site
-                    inverters = await self.get_site_inverters(session, access_token, site_id)
-                    
-                    all_sites_data[site_name] = {
-                        'id': site_id,
-                        'inverters': inverters if inverters is not None else {}
-                    }
+                page_sites[page] = [
+                    (plant['name'], plant['id'],
+                     asyncio.create_task(self.get_site_inverters(session, access_token, plant['id'])))
+                    for plant in plants_info['data']['infos']
+                ]
+
+        async def fetch_page(page: int) -> Tuple[int, Optional[Dict]]:
+            async with page_slots:
+                return page, await self.get_plants(session, access_token, page, page_size)
+
+        # The first page reports the total plant count, so only the needed pages are requested
+        first_page = await self.get_plants(session, access_token, 1, page_size)
+        schedule_inverters(1, first_page)
+        total_pages = self._plant_page_count(first_page, page_size)
+        
+        plant_tasks = [fetch_page(page) for page in range(2, total_pages + 1)]
+        for next_page in asyncio.as_completed(plant_tasks):
+            page, plants_info = await next_page
+            schedule_inverters(page, plants_info)
+        
+        # Assemble in page order so results don't depend on response timing
+        site_entries = [entry for page in sorted(page_sites) for entry in page_sites[page]]
+        inverter_results = await asyncio.gather(
+            *[task for _, _, task in site_entries],
+            return_exceptions=True
+        )
+        
+        for (site_name, site_id, _), inverters in zip(site_entries, inverter_results):
+            if isinstance(inverters, Exception):
+                logger.error(f"Failed to fetch inverters for site {site_id}. Error: {inverters}")
+                inverters = None
+            all_sites_data[site_name] = {
+                'id': site_id,
+                'inverters': inverters if inverters is not None else {}
+            }
         
         return all_sites_data
\ No newline at end of file
@@ -1,10 +1,10 @@
 import logging
-from typing import Dict, List, Optional
+from typing import Dict, Optional
 from dataclasses import dataclass
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+@dataclass(slots=True)
 class SiteAnalysis:
     site_id: str
     inverter_sn: str
@@ -26,15 +26,10 @@ class DataAnalyzer:
     def __init__(self, config: Dict):
         self.config = config
 
-    def _extract_records(self, data: List[Dict], label: str) -> List[Dict]:
-        """Extract records for a specific label from data"""
-        for info in data:
-            if info['label'] == label:
-                return info.get('records', [])
-        return []
-
     def _analyze_site(self, site_name: str, site_info: Dict) -> SiteAnalysis:
         """Analyze data for a single site"""
+        import numpy as np  # Deferred so importing the analyzer stays cheap
+        
         site_id = site_info['site_id']
         inverter_sn = site_info['inverter_sn']
         inverter_type = site_info['inverter_type']
@@ -59,12 +54,15 @@ class DataAnalyzer:
             yesterday_max_soc=yesterday_max_soc
         )
 
-        soc_records = next((info['records'] for info in data if info['label'] == 'SOC'), [])
-        v_bat_records = next((info['records'] for info in data if info['label'] == 'V-bat'), [])
-        vbms_records = next((info['records'] for info in data if info['label'] == 'BMS Voltage'), [])
+        # Index records by label in a single pass
+        records_by_label = {info['label']: info.get('records', []) for info in data}
+        soc_records = records_by_label.get('SOC', [])
+        v_bat_records = records_by_label.get('V-bat', [])
+        vbms_records = records_by_label.get('BMS Voltage', [])
 
         if soc_records:
-            lowest_soc_record = min(soc_records, key=lambda x: float(x['value']))
+            soc_values = np.fromiter((float(r['value']) for r in soc_records), dtype=np.float64, count=len(soc_records))
+            lowest_soc_record = soc_records[int(soc_values.argmin())]
             current_soc_record = soc_records[-1]
             analysis.lowest_soc = lowest_soc_record['value']
             analysis.lowest_soc_time = lowest_soc_record['time']
@@ -79,17 +77,17 @@ class DataAnalyzer:
             analysis.current_vbms = float(current_vbms_record['value'])
             analysis.current_voltage_time = current_v_bat_record['time']
             
-            # Calculate max voltage difference
-            for v_bat_rec, vbms_rec in zip(v_bat_records, vbms_records):
-                v_bat_value = float(v_bat_rec['value'])
-                vbms_value = float(vbms_rec['value'])
-                diff = abs(v_bat_value - vbms_value)
-                
-                if analysis.max_v_diff is None or diff > analysis.max_v_diff:
-                    analysis.max_v_diff = diff
-                    analysis.max_diff_time = v_bat_rec['time']
-                    analysis.max_v_bat = v_bat_value
-                    analysis.max_v_bat_time = v_bat_rec['time']
+            # Calculate max voltage difference over paired readings
+            count = min(len(v_bat_records), len(vbms_records))
+            v_bat_values = np.fromiter((float(r['value']) for r in v_bat_records[:count]), dtype=np.float64, count=count)
+            vbms_values = np.fromiter((float(r['value']) for r in vbms_records[:count]), dtype=np.float64, count=count)
+            diffs = np.abs(v_bat_values - vbms_values)
+            idx = int(diffs.argmax())
+            
+            analysis.max_v_diff = float(diffs[idx])
+            analysis.max_diff_time = v_bat_records[idx]['time']
+            analysis.max_v_bat = float(v_bat_values[idx])
+            analysis.max_v_bat_time = v_bat_records[idx]['time']
 
         return analysis
 
@@ -1,6 +1,7 @@
 import os
 import time
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 import logging
 
 logger = logging.getLogger(__name__)
@@ -19,20 +20,28 @@ class DataCleanupManager:
         """Cleanup old data files and logs"""
         logger.info("Starting data cleanup process")
         
-        for directory, retention_period in self.retention_periods.items():
-            if not os.path.exists(directory):
-                continue
-                
-            current_time = datetime.now()
-            for filename in os.listdir(directory):
-                filepath = os.path.join(directory, filename)
-                if filename.startswith('.'):  # Skip .gitkeep files
+        current_ts = time.time()
+        # Directory scans are metadata-bound, so overlap them across threads
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(
+                lambda item: self._cleanup_directory(item[0], item[1], current_ts),
+                self.retention_periods.items()
+            ))
+
+    def _cleanup_directory(self, directory: str, retention_period: timedelta, current_ts: float):
+        """Remove files in a directory older than the retention period"""
+        if not os.path.exists(directory):
+            return
+            
+        retention_seconds = retention_period.total_seconds()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.startswith('.'):  # Skip .gitkeep files
                     continue
                     
-                file_time = datetime.fromtimestamp(os.path.getmtime(filepath))
-                if current_time - file_time > retention_period:
+                if current_ts - entry.stat().st_mtime > retention_seconds:
                     try:
-                        os.remove(filepath)
-                        logger.info(f"Removed old file: {filepath}")
+                        os.remove(entry.path)
+                        logger.info(f"Removed old file: {entry.path}")
                     except Exception as e:
-                        logger.error(f"Error removing {filepath}: {e}")
+                        logger.error(f"Error removing {entry.path}: {e}")
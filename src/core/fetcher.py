@@ -1,26 +1,67 @@
 import asyncio
 import aiohttp
 import logging
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Tuple
 from datetime import datetime
-from ..api.sunsynk import SunSynkAPI
-from ..validators.site_validator import SiteValidator
-from aiolimiter import AsyncLimiter
+from ..api.sunsynk import SunSynkAPI, json_loads, orjson
+from ..validators.site_validator import SiteValidator, SiteValidation
 from datetime import timedelta
+import dataclasses
+import hashlib
 import json
 import os
-from ..core.analyzer import SiteAnalysis
+import time
+
+try:
+    import xxhash
+except ImportError:  # Fall back to the standard library
+    xxhash = None
 
 logger = logging.getLogger(__name__)
 
+_DAY_URL_TMPL = "https://api.sunsynk.net/api/v1/inverter/{sn}/day?sn={sn}&date={start}&edate={end}&lan=en&params={params}"
+
+def _day_strings() -> Tuple[str, str]:
+    """Return today's and yesterday's dates as YYYY-MM-DD"""
+    now = datetime.today()
+    return now.strftime('%Y-%m-%d'), (now - timedelta(days=1)).strftime('%Y-%m-%d')
+
+def _dumps(data, indent: bool = False) -> bytes:
+    """Serialize data (including SiteAnalysis dataclasses) to JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(data, indent=2 if indent else None, default=dataclasses.asdict).encode()
+
+def _digest(payload: bytes) -> int:
+    """Fast 64-bit content hash used to detect unchanged payloads"""
+    if xxhash is not None:
+        return xxhash.xxh64(payload).intdigest()
+    return int.from_bytes(hashlib.blake2b(payload, digest_size=8).digest(), 'big')
+
+def _atomic_write(filepath: str, payload: bytes):
+    """Write payload to a temporary file and rename it over filepath"""
+    tmp_path = filepath + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(payload)
+    os.replace(tmp_path, filepath)
+
 class DataFetcher:
+    CACHE_TTL = 6 * 3600  # Seconds a cached site list stays valid
+    YESTERDAY_TIMEOUT = aiohttp.ClientTimeout(total=10)  # Fallback request only, keep it short
+    RETRY_STATUSES = frozenset({429, 502, 503, 504})
+
     def __init__(self, config: Dict):
         self.config = config
         self.api = SunSynkAPI(config)
         self.validator = None
-        self.rate_limit = AsyncLimiter(20, 1)
+        self._validated_sites: Optional[Dict[str, SiteValidation]] = None
+        # Share the API client's limiter so every SunSynk request draws on one budget
+        self.rate_limit = self.api.rate_limit
         self.cache_file = 'data/cache/site_validator_cache.json'
-        self.last_refresh_file = 'data/cache/last_refresh.txt'
+        self.cache_ttl = self.CACHE_TTL
+        self._access_token: Optional[str] = None
+        self._token_expiry = 0.0
+        self._last_hashes: Dict[str, int] = {}  # filepath -> digest of the last payload written
         
         # Create cache directory if it doesn't exist
         os.makedirs('data/cache', exist_ok=True)
@@ -28,257 +69,280 @@ class DataFetcher:
         # Try to load cached validator
         self._load_cached_validator()
 
+    async def start(self):
+        """Open the HTTP session shared by every fetch cycle"""
+        await self.api.start()
+
+    async def stop(self):
+        """Close the shared HTTP session"""
+        await self.api.close()
+        self._access_token = None
+
+    async def _get_access_token(self, session: aiohttp.ClientSession) -> Optional[str]:
+        """Return the cached access token, re-authenticating once it has expired"""
+        if self._access_token and time.monotonic() < self._token_expiry:
+            return self._access_token
+        
+        logger.info("Authenticating with SunSynk API...")
+        access_token, expires_in = await self.api.get_token(
+            session, 
+            self.config['api']['sunsynk']['username'],
+            self.config['api']['sunsynk']['password']
+        )
+        if access_token:
+            # Renew a minute early so in-flight requests don't race the expiry
+            self._access_token = access_token
+            self._token_expiry = time.monotonic() + float(expires_in or 0) - 60
+        return access_token
+
     def _load_cached_validator(self):
-        """Load cached validator if it exists and is from today"""
+        """Load cached validator if it exists and is younger than the cache TTL"""
         try:
-            if os.path.exists(self.last_refresh_file):
-                with open(self.last_refresh_file, 'r') as f:
-                    last_refresh = datetime.fromisoformat(f.read().strip())
-                    
-                # Only use cache if it's from today
-                if last_refresh.date() == datetime.now().date():
-                    logger.info("Found valid cache from today")
-                    if os.path.exists(self.cache_file):
-                        with open(self.cache_file, 'r') as f:
-                            cached_data = json.load(f)
-                            self.validator = SiteValidator(self.config['sites_config'], cached_data)
-                            logger.info("Successfully loaded cached validator")
-                            return
+            try:
+                age = time.time() - os.path.getmtime(self.cache_file)
+            except OSError:
+                age = None
+            
+            if age is not None and age < self.cache_ttl:
+                logger.info(f"Found valid cache ({age / 3600:.1f}h old)")
+                with open(self.cache_file, 'rb') as f:
+                    cached_data = json_loads(f.read())
+                    self.validator = SiteValidator(self.config['sites_config'], cached_data)
+                    logger.info("Successfully loaded cached validator")
+                    return
             
             logger.info("No valid cache found or cache is outdated")
         except Exception as e:
             logger.error(f"Error loading cache: {e}")
 
     def _save_to_cache(self, data: Dict):
-        """Save validator data to cache"""
+        """Save validator data to cache (the file mtime records the refresh time)"""
         try:
-            with open(self.cache_file, 'w') as f:
-                json.dump(data, f)
-            with open(self.last_refresh_file, 'w') as f:
-                f.write(datetime.now().isoformat())
+            _atomic_write(self.cache_file, _dumps(data))
             logger.info("Successfully saved data to cache")
         except Exception as e:
             logger.error(f"Error saving to cache: {e}")
 
-    async def _get_all_sites(self, session: aiohttp.ClientSession, access_token: str) -> Dict:
-        """Fetch all sites data - reference to original implementation"""
-        # Reference to original implementation:
-        """python:STEP1_fetch_site_details_and_SN.py
-        startLine: 114
-        endLine: 156
+    async def _get_json(self, session: aiohttp.ClientSession, url: str, headers: Dict,
+                        timeout: Optional[aiohttp.ClientTimeout] = None,
+                        attempts: int = 3) -> Tuple[int, Optional[Dict]]:
+        """GET a JSON payload, retrying transient failures with exponential backoff
+        
+        Returns the last HTTP status (0 if no response was received) and the
+        parsed body, which is None unless the request succeeded.
         """
-        all_sites_data = {}
-        total_pages = 14
-
-        plant_tasks = [self.api.get_plants(session, access_token, page) 
-                      for page in range(1, total_pages + 1)]
-        plants_info_list = await asyncio.gather(*plant_tasks)
+        request_kwargs = {'headers': headers}
+        if timeout is not None:
+            request_kwargs['timeout'] = timeout
         
-        for plants_info in plants_info_list:
-            if plants_info and isinstance(plants_info, dict) and 'data' in plants_info and 'infos' in plants_info['data']:
-                for plant in plants_info['data']['infos']:
-                    site_name = plant['name']
-                    site_id = plant['id']
-                    all_sites_data[site_name] = {'id': site_id}
+        status = 0
+        for attempt in range(attempts):
+            delay = min(2 ** attempt, 8)
+            try:
+                async with self.rate_limit:
+                    async with session.get(url, **request_kwargs) as response:
+                        status = response.status
+                        if status == 200:
+                            return status, await response.json(loads=json_loads)
+                        if status not in self.RETRY_STATUSES:
+                            return status, None
+                        retry_after = response.headers.get('Retry-After', '')
+                        if status == 429 and retry_after.isdigit():
+                            delay = min(int(retry_after), 60)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                status = 0
+                logger.warning(f"Request failed for {url}: {e!r}")
+            
+            if attempt < attempts - 1:
+                logger.info(f"Retrying {url} in {delay} seconds (status {status})...")
+                await asyncio.sleep(delay)
         
-        return all_sites_data
+        return status, None
 
-    async def _get_site_inverters(self, session: aiohttp.ClientSession, access_token: str, 
-                                site_name: str, site_id: int) -> Optional[Dict]:
-        """Fetch inverters for a specific site"""
-        inverters = await self.api.get_site_inverters(session, access_token, site_id)
-        if inverters is not None:
-            return {
-                'id': site_id,
-                'inverters': inverters
-            }
-        return None
+    def _split_days(self, data: Dict, today: str, yesterday: str) -> Optional[float]:
+        """Trim records to today in place and return yesterday's max SOC, if present"""
+        yesterday_soc = []
+        for info in data['data']['infos']:
+            records = info.get('records') or []
+            if info['label'] == 'SOC':
+                yesterday_soc = [float(r['value']) for r in records if r['time'].startswith(yesterday)]
+            info['records'] = [r for r in records if r['time'].startswith(today)]
+        return max(yesterday_soc) if yesterday_soc else None
 
     async def _fetch_inverter_data(self, session: aiohttp.ClientSession, access_token: str, 
-                                 sn: str, site_name: str, site_id: int, inverter_type: str) -> Dict:
+                                 sn: str, site_name: str, site_id: int, inverter_type: str,
+                                 today: Optional[str] = None, yesterday: Optional[str] = None) -> Dict:
         """Fetch data for a specific inverter"""
-        today = datetime.today().strftime('%Y-%m-%d')
-        # params=16,18,106 includes SOC, V-bat, and BMS Voltage
-        full_url = f"https://api.sunsynk.net/api/v1/inverter/{sn}/day?sn={sn}&date={today}&edate={today}&lan=en&params=16,18,106"
+        if today is None or yesterday is None:
+            today, yesterday = _day_strings()
+        # params=16,18,106 includes SOC, V-bat, and BMS Voltage; one request covers yesterday and today
+        full_url = _DAY_URL_TMPL.format(sn=sn, start=yesterday, end=today, params='16,18,106')
         
         headers = {
             'accept': 'application/json',
             'Authorization': f'Bearer {access_token}',
         }
         
-        async with self.rate_limit:
-            try:
-                async with session.get(full_url, headers=headers) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        logger.debug(f"Raw data for {site_name}: {data}")
-                        logger.info(f"Data fetched successfully for {site_name}")
-                        
-                        # Fetch yesterday's max SOC
-                        yesterday_max_soc = await self._fetch_yesterday_data(session, access_token, sn)
-                        logger.info(f"Yesterday's max SOC for {site_name}: {yesterday_max_soc}")
-                        
-                        return {
-                            'site_id': site_id,
-                            'inverter_sn': sn,
-                            'inverter_type': inverter_type,
-                            'data': data,
-                            'yesterday_max_soc': yesterday_max_soc
-                        }
-                    else:
-                        logger.error(f"Failed to fetch data for {site_name}. Status: {response.status}")
-                        return None
-            except Exception as e:
-                logger.error(f"Error fetching data for {site_name}: {e}")
+        try:
+            status, data = await self._get_json(session, full_url, headers)
+            if data is None:
+                if status == 401:
+                    # Token was rejected; authenticate again on the next cycle
+                    self._access_token = None
+                logger.error(f"Failed to fetch data for {site_name}. Status: {status}")
                 return None
-    
+            
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Raw data for %s: %s", site_name, data)
+            logger.info(f"Data fetched successfully for {site_name}")
+            
+            # Split out yesterday's max SOC, falling back to a separate request if absent
+            yesterday_max_soc = self._split_days(data, today, yesterday)
+            if yesterday_max_soc is None:
+                yesterday_max_soc = await self._fetch_yesterday_data(session, access_token, sn, yesterday)
+            logger.info(f"Yesterday's max SOC for {site_name}: {yesterday_max_soc}")
+            
+            return {
+                'site_id': site_id,
+                'inverter_sn': sn,
+                'inverter_type': inverter_type,
+                'data': data,
+                'yesterday_max_soc': yesterday_max_soc
+            }
+        except Exception as e:
+            logger.error(f"Error fetching data for {site_name}: {e}")
+            return None
             
     async def fetch_data(self) -> Dict:
         """Fetch current data for all validated sites"""
         logger.info("Starting data fetch cycle...")
         
-        # Only fetch sites if validator isn't initialized
-        if self.validator is None:
-            logger.info("No cached validator found. Performing initial site refresh...")
-            all_sites = await self.fetch_all_sites()
-            if not all_sites:
-                logger.error("Failed to fetch initial sites data")
+        session = await self.api.start()
+        try:
+            access_token = await self._get_access_token(session)
+            
+            if not access_token:
+                logger.error("Failed to obtain access token")
                 return {}
-            self.validator = SiteValidator(self.config['sites_config'], all_sites)
-            self._save_to_cache(all_sites)
 
-        connector = aiohttp.TCPConnector(ssl=False, limit=50)  # Increased connection limit
-        timeout = aiohttp.ClientTimeout(total=30)
-        
-        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
-            try:
-                logger.info("Authenticating with SunSynk API...")
-                access_token, _ = await self.api.get_token(
-                    session, 
-                    self.config['api']['sunsynk']['username'],
-                    self.config['api']['sunsynk']['password']
-                )
-                
-                if not access_token:
-                    logger.error("Failed to obtain access token")
+            logger.info("Successfully obtained access token")
+            results = {}
+            
+            # Only fetch sites if validator isn't initialized
+            if self.validator is None:
+                logger.info("No cached validator found. Performing initial site refresh...")
+                all_sites = await self.fetch_all_sites(session, access_token)
+                if not all_sites:
+                    logger.error("Failed to fetch initial sites data")
                     return {}
-
-                logger.info("Successfully obtained access token")
-                results = {}
-                
-                validated_sites = self.validator.validate_sites()
-                logger.info(f"Found {sum(1 for v in validated_sites.values() if v.status == 'valid')} valid sites to process")
-                
-                for site_name, validation in validated_sites.items():
-                    if validation.status == 'valid':
-                        logger.info(f"Fetching data for site: {site_name} (SN: {validation.inverter_sn})")
-                        try:
-                            data = await self._fetch_inverter_data(
-                                session, 
-                                access_token,
-                                validation.inverter_sn,
-                                site_name,
-                                validation.site_id,
-                                validation.inverter_type
-                            )
-                            if data:
-                                results[site_name] = data
-                        except Exception as e:
-                            logger.error(f"Error fetching data for {site_name}: {str(e)}", exc_info=True)
-                    else:
-                        logger.warning(f"Skipping invalid site: {site_name}")
-                
-                logger.info(f"Data fetch cycle complete - Processed {len(results)} sites")
-                return results
-                
-            except Exception as e:
-                logger.error(f"Fatal error in fetch_data: {str(e)}", exc_info=True)
-                return {}
-        
+                self.validator = SiteValidator(self.config['sites_config'], all_sites)
+                self._validated_sites = None
+                await asyncio.to_thread(self._save_to_cache, all_sites)
+            
+            # Validation only changes when the validator is rebuilt, so reuse it between cycles
+            if self._validated_sites is None:
+                self._validated_sites = self.validator.validate_sites()
+            validated_sites = self._validated_sites
+            valid_sites = []
+            for site_name, validation in validated_sites.items():
+                if validation.status == 'valid':
+                    valid_sites.append((site_name, validation))
+                else:
+                    logger.warning(f"Skipping invalid site: {site_name}")
+            logger.info(f"Found {len(valid_sites)} valid sites to process")
+            
+            # Fetch all sites concurrently; pacing is left to the rate limiter.
+            # Dates are fixed once per cycle so every site sees the same "today".
+            today, yesterday = _day_strings()
+            fetched = await asyncio.gather(
+                *[
+                    self._fetch_inverter_data(
+                        session, 
+                        access_token,
+                        validation.inverter_sn,
+                        site_name,
+                        validation.site_id,
+                        validation.inverter_type,
+                        today=today,
+                        yesterday=yesterday
+                    )
+                    for site_name, validation in valid_sites
+                ],
+                return_exceptions=True
+            )
+            
+            for (site_name, _), data in zip(valid_sites, fetched):
+                if isinstance(data, Exception):
+                    logger.error(f"Error fetching data for {site_name}: {str(data)}", exc_info=data)
+                elif data:
+                    results[site_name] = data
+            
+            logger.info(f"Data fetch cycle complete - Processed {len(results)} sites")
+            return results
+            
+        except Exception as e:
+            logger.error(f"Fatal error in fetch_data: {str(e)}", exc_info=True)
+            return {}
+    
     def save_data(self, data: Dict, filepath: str):
         """Save data to a JSON file"""
         try:
-            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            payload = _dumps(data, indent=True)
+            
+            # Skip the write when the file already holds identical content
+            digest = _digest(payload)
+            if self._last_hashes.get(filepath) == digest and os.path.exists(filepath):
+                logger.debug("Data unchanged, skipped writing %s", filepath)
+                return
             
-            # Convert SiteAnalysis objects to dict if needed
-            if any(isinstance(v, SiteAnalysis) for v in data.values()):
-                data = self._convert_analysis_to_dict(data)
-                
-            with open(filepath, 'w') as f:
-                json.dump(data, f, indent=4)
-            logger.debug(f"Data saved to {filepath}")
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            _atomic_write(filepath, payload)
+            self._last_hashes[filepath] = digest
+            logger.debug("Data saved to %s", filepath)
         except Exception as e:
             logger.error(f"Error saving data to {filepath}: {e}")
         
-    def _convert_analysis_to_dict(self, analysis_results: Dict) -> Dict:
-        """Convert SiteAnalysis objects to dictionary for JSON serialization"""
-        return {
-            site_name: {
-                'site_id': analysis.site_id,
-                'inverter_sn': analysis.inverter_sn,
-                'inverter_type': analysis.inverter_type,
-                'lowest_soc': analysis.lowest_soc,
-                'lowest_soc_time': analysis.lowest_soc_time,
-                'current_soc': analysis.current_soc,
-                'current_soc_time': analysis.current_soc_time,
-                'max_v_diff': analysis.max_v_diff,
-                'max_diff_time': analysis.max_diff_time,
-                'max_v_bat': analysis.max_v_bat,
-                'max_v_bat_time': analysis.max_v_bat_time,
-                'current_v_bat': analysis.current_v_bat,
-                'current_vbms': analysis.current_vbms,
-                'current_voltage_time': analysis.current_voltage_time
-            }
-            for site_name, analysis in analysis_results.items()
-        }
-        
     async def _fetch_yesterday_data(self, session: aiohttp.ClientSession, access_token: str, 
-                                  sn: str) -> Optional[float]:
+                                  sn: str, yesterday: Optional[str] = None) -> Optional[float]:
         """Fetch yesterday's SOC data"""
-        yesterday = (datetime.today() - timedelta(days=1)).strftime('%Y-%m-%d')
-        url = f"https://api.sunsynk.net/api/v1/inverter/{sn}/day?sn={sn}&date={yesterday}&edate={yesterday}&lan=en&params=16"
+        if yesterday is None:
+            _, yesterday = _day_strings()
+        url = _DAY_URL_TMPL.format(sn=sn, start=yesterday, end=yesterday, params='16')
         
-        async with self.rate_limit:
-            try:
-                async with session.get(url, headers={'Authorization': f'Bearer {access_token}'}) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        soc_records = next((info['records'] for info in data['data']['infos'] 
-                                         if info['label'] == 'SOC'), [])
-                        if soc_records:
-                            return max(float(record['value']) for record in soc_records)
-                    return None
-            except Exception as e:
-                logger.error(f"Error fetching yesterday's data for {sn}: {e}")
-                return None
+        try:
+            _, data = await self._get_json(session, url, {'Authorization': f'Bearer {access_token}'},
+                                           timeout=self.YESTERDAY_TIMEOUT)
+            if data is not None:
+                soc_records = next((info['records'] for info in data['data']['infos'] 
+                                 if info['label'] == 'SOC'), [])
+                if soc_records:
+                    return max(float(record['value']) for record in soc_records)
+            return None
+        except Exception as e:
+            logger.error(f"Error fetching yesterday's data for {sn}: {e}")
+            return None
         
-    async def fetch_all_sites(self) -> Dict:
-        """Fetch all sites data"""
+    async def fetch_all_sites(self, session: Optional[aiohttp.ClientSession] = None,
+                              access_token: Optional[str] = None) -> Dict:
+        """Fetch all sites data, reusing the caller's session and token when given"""
         logger.info("Starting to fetch all sites")
-        connector = aiohttp.TCPConnector(ssl=False, limit=10)
-        timeout = aiohttp.ClientTimeout(total=30)
+        if session is None:
+            session = await self.api.start()
         
-        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
-            # Get token
-            access_token, _ = await self.api.get_token(
-                session, 
-                self.config['api']['sunsynk']['username'],
-                self.config['api']['sunsynk']['password']
-            )
+        if access_token is None:
+            access_token = await self._get_access_token(session)
             
             if not access_token:
                 logger.error("Failed to acquire access token")
                 return {}
 
             logger.info("Successfully obtained access token, fetching sites...")
-            # Use the API's get_all_sites method directly
-            all_sites = await self.api.get_all_sites(session, access_token)
-            
-            if not all_sites:
-                logger.error("No sites returned from API")
-                return {}
-                
-            logger.info(f"Successfully fetched {len(all_sites)} sites with inverter data")
-            return all_sites
+        # Use the API's get_all_sites method directly
+        all_sites = await self.api.get_all_sites(session, access_token)
         
-        
\ No newline at end of file
+        if not all_sites:
+            logger.error("No sites returned from API")
+            return {}
+            
+        logger.info(f"Successfully fetched {len(all_sites)} sites with inverter data")
+        return all_sites
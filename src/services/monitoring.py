@@ -1,7 +1,7 @@
 import asyncio
 import logging
-from datetime import datetime, time
-from typing import Dict, Optional
+from datetime import datetime, time, timedelta
+from typing import Awaitable, Callable, Dict, Optional
 from src.api.sunsynk import SunSynkAPI
 from src.core.fetcher import DataFetcher
 from src.core.analyzer import DataAnalyzer
@@ -20,6 +20,7 @@ class MonitoringService:
         self.publisher = GoogleSheetsPublisher(config)
         self.validated_sites = {}  # Cache for validated sites
         
+        self.cleanup_time = time(4, 0)  # 4 AM
         self.site_refresh_time = time(5, 0)  # 5 AM
         self.data_fetch_interval = config['monitoring']['fetch_interval']  # Get from config
         
@@ -33,17 +34,19 @@ class MonitoringService:
             all_sites = await self.fetcher.fetch_all_sites()
             logger.info(f"Retrieved {len(all_sites)} total sites from API")
             
-            # Update validator and cache
-            self.fetcher.validator = SiteValidator(self.config['sites_config'], all_sites)
-            self.fetcher._save_to_cache(all_sites)
-            
+            # Update validator and its validated sites together, before yielding to other tasks
             logger.info("Starting site validation process...")
-            self.validated_sites = self.fetcher.validator.validate_sites()
+            validator = SiteValidator(self.config['sites_config'], all_sites)
+            self.validated_sites = validator.validate_sites()
+            self.fetcher.validator = validator
+            self.fetcher._validated_sites = self.validated_sites
             logger.info(f"Validation complete - Found {len(self.validated_sites)} configured sites")
             
+            await asyncio.to_thread(self.fetcher._save_to_cache, all_sites)
+            
             # Save to data/raw directory
             logger.info("Saving raw site data to disk...")
-            self.fetcher.save_data(all_sites, 'data/raw/all_sites_data.json')
+            await asyncio.to_thread(self.fetcher.save_data, all_sites, 'data/raw/all_sites_data.json')
             logger.info("Daily site data refresh completed successfully")
             return all_sites
         except Exception as e:
@@ -60,11 +63,11 @@ class MonitoringService:
                 return
 
             # Save raw data
-            self.fetcher.save_data(current_data, 'data/raw/fetched_inverter_data.json')
+            await asyncio.to_thread(self.fetcher.save_data, current_data, 'data/raw/fetched_inverter_data.json')
 
-            # Analyze the data
-            analysis_results = self.analyzer.analyze(current_data)
-            self.fetcher.save_data(analysis_results, 'data/processed/analysis_results.json')
+            # Analyze the data off the event loop
+            analysis_results = await asyncio.to_thread(self.analyzer.analyze, current_data)
+            await asyncio.to_thread(self.fetcher.save_data, analysis_results, 'data/processed/analysis_results.json')
 
             # Publish to Google Sheets
             await self.publisher.publish(analysis_results)
@@ -72,34 +75,53 @@ class MonitoringService:
         except Exception as e:
             logger.error(f"Error in fetch and process cycle: {e}")
 
-    async def _should_refresh_sites(self) -> bool:
-        """Check if it's time for daily site refresh"""
-        now = datetime.now().time()
-        should_refresh = now.hour == self.site_refresh_time.hour and now.minute == self.site_refresh_time.minute
-        logger.debug(f"Checking refresh time - Current: {now.strftime('%H:%M')}, Target: {self.site_refresh_time.strftime('%H:%M')}, Should refresh: {should_refresh}")
-        return should_refresh
+    async def _run_cleanup(self):
+        """Cleanup old files without blocking the event loop"""
+        await asyncio.to_thread(self.cleanup_manager.cleanup_old_data)
 
-    async def run(self):
-        """Main service loop"""
-        logger.info("Starting monitoring service")
+    async def _periodic(self, job: Callable[[], Awaitable], interval: float):
+        """Run job, then wait interval seconds before running it again"""
+        while True:
+            try:
+                await job()
+            except Exception as e:
+                logger.error(f"Error in {job.__name__}: {e}")
+            await asyncio.sleep(interval)
+
+    async def _daily_at(self, at: time, job: Callable[[], Awaitable]):
+        """Run job every day at the given local time"""
+        def upcoming(now: datetime) -> datetime:
+            run_at = datetime.combine(now.date(), at)
+            return run_at if run_at > now else run_at + timedelta(days=1)
         
+        next_run = upcoming(datetime.now())
         while True:
+            logger.debug("Next %s run at %s", job.__name__, next_run)
+            # Re-check after waking in case the wall clock was stepped back meanwhile
+            while (now := datetime.now()) < next_run:
+                await asyncio.sleep((next_run - now).total_seconds())
+            
             try:
-                # Run cleanup daily at 4 AM (before site refresh)
-                now = datetime.now().time()
-                if now.hour == 4 and now.minute == 0:
-                    self.cleanup_manager.cleanup_old_data()
-                
-                # Check for daily site refresh
-                if await self._should_refresh_sites():
-                    await self._refresh_site_data()
+                await job()
+            except Exception as e:
+                logger.error(f"Error in {job.__name__}: {e}")
+            
+            # Advance from the previous target so a clock step can't repeat today's run
+            next_run += timedelta(days=1)
+            if next_run <= datetime.now():
+                next_run = upcoming(datetime.now())
 
+    async def run(self):
+        """Main service loop"""
+        logger.info("Starting monitoring service")
+        await self.fetcher.start()
+        
+        try:
+            async with asyncio.TaskGroup() as tasks:
                 # Regular data fetch and processing cycle
-                await self._fetch_and_process_data()
-                
-                # Wait for next cycle
-                await asyncio.sleep(self.data_fetch_interval)
-                
-            except Exception as e:
-                logger.error(f"Error in main service loop: {e}")
-                await asyncio.sleep(60)  # Wait a minute before retrying
\ No newline at end of file
+                tasks.create_task(self._periodic(self._fetch_and_process_data, self.data_fetch_interval))
+                # Daily cleanup (before site refresh) and site refresh
+                tasks.create_task(self._daily_at(self.cleanup_time, self._run_cleanup))
+                tasks.create_task(self._daily_at(self.site_refresh_time, self._refresh_site_data))
+        finally:
+            await self.fetcher.stop()
@@ -1,16 +1,39 @@
-import yaml
+import os
 import logging
-from typing import Dict, List, Optional, Tuple
+from functools import lru_cache
+from typing import Dict, List, Literal, Optional, Tuple
 from dataclasses import dataclass
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+# Inverter equipment modes that can be monitored (None is treated as 'M')
+_VALID_TYPES = frozenset({'M', 'M1', None})
+
+SiteStatus = Literal['valid', 'invalid']
+
+def _safe_load(file):
+    """yaml.safe_load, using the LibYAML-backed loader when it is available"""
+    import yaml  # Deferred until a YAML file is actually parsed
+    
+    try:
+        from yaml import CSafeLoader as SafeLoader
+    except ImportError:
+        from yaml import SafeLoader
+    return yaml.load(file, Loader=SafeLoader)
+
+@lru_cache(maxsize=4)
+def _load_sla_sites(path: str, mtime_ns: int) -> Tuple[Dict, ...]:
+    """Parse the SLA site list; mtime_ns is part of the cache key so edits are picked up"""
+    with open(path, 'r') as file:
+        sites_config = _safe_load(file) or {}
+    return tuple(sites_config.get('sla_sites') or [])
+
+@dataclass(slots=True)
 class SiteValidation:
     exists: bool = False
     id_matches: bool = False
     has_inverters: bool = False
-    status: str = 'invalid'
+    status: SiteStatus = 'invalid'
     inverter_sn: Optional[str] = None
     inverter_type: Optional[str] = None
     site_id: Optional[str] = None
@@ -20,51 +43,58 @@ class SiteValidator:
         self.sites_config_path = sites_config_path
         self.all_sites_data = all_sites_data
         self.load_sites_config()
+        self._site_index = self._build_site_index()
 
     def load_sites_config(self):
-        with open(self.sites_config_path, 'r') as file:
-            self.sites_config = yaml.safe_load(file)
+        mtime_ns = os.stat(self.sites_config_path).st_mtime_ns
+        self.sla_sites = _load_sla_sites(self.sites_config_path, mtime_ns)
+
+    def _build_site_index(self) -> Dict[str, Tuple[str, bool, Optional[str], Optional[str]]]:
+        """Map site_id -> (actual_name, has_inverter_list, first_valid_sn, inverter_type) in one pass"""
+        index = {}
+        for site_name, site_data in self.all_sites_data.items():
+            inverters = site_data.get('inverters')
+            valid_sn, valid_type = None, None
+            if inverters is not None:
+                for sn, inv_type in inverters.items():
+                    if inv_type in _VALID_TYPES:
+                        valid_sn, valid_type = sn, inv_type or 'M'
+                        break
+            index[str(site_data['id'])] = (site_name, inverters is not None, valid_sn, valid_type)
+        return index
 
     def validate_sites(self) -> Dict[str, SiteValidation]:
         results = {}
+        debug = logger.isEnabledFor(logging.DEBUG)
         logger.info(f"Starting site validation with {len(self.all_sites_data)} sites")
-        logger.debug(f"Available sites: {list(self.all_sites_data.keys())}")
-        logger.debug(f"First site data example: {next(iter(self.all_sites_data.items()), None)}")
-        
-        # First, create a mapping of site_id to site_data
-        site_id_map = {
-            str(site_data['id']): {'name': site_name, 'data': site_data}
-            for site_name, site_data in self.all_sites_data.items()
-        }
-        logger.debug(f"Created site ID mapping with {len(site_id_map)} entries")
+        if debug:
+            logger.debug(f"Available sites: {list(self.all_sites_data.keys())}")
+            logger.debug(f"First site data example: {next(iter(self.all_sites_data.items()), None)}")
+            logger.debug(f"Using site ID index with {len(self._site_index)} entries")
         
-        for site in self.sites_config.get('sla_sites', []):
+        for site in self.sla_sites:
             site_name = site['name']
             site_id = str(site['site_id'])
             logger.info(f"Validating site: {site_name} (ID: {site_id})")
             
             validation = SiteValidation()
             validation.site_id = site_id
-            if site_id in site_id_map:
-                logger.debug(f"Site ID {site_id} found in available sites")
+            indexed = self._site_index.get(site_id)
+            if indexed is not None:
+                if debug:
+                    logger.debug(f"Site ID {site_id} found in available sites")
                 validation.exists = True
-                site_data = site_id_map[site_id]['data']
-                actual_name = site_id_map[site_id]['name']
                 validation.id_matches = True
+                _, has_inverter_list, sn, inv_type = indexed
                 
-                if 'inverters' in site_data:
-                    logger.debug(f"Found {len(site_data['inverters'])} inverters for site {site_name}")
-                    for sn, inv_type in site_data['inverters'].items():
-                        logger.debug(f"Checking inverter SN: {sn}, Type: {inv_type}")
-                        if inv_type in ['M', 'M1'] or inv_type is None:
-                            validation.has_inverters = True
-                            validation.inverter_sn = sn
-                            validation.inverter_type = inv_type or 'M'
-                            validation.status = 'valid'
-                            logger.info(f"Valid inverter found for {site_name} - SN: {sn}, Type: {validation.inverter_type}")
-                            break
-                else:
+                if not has_inverter_list:
                     logger.warning(f"No inverters found for site {site_name}")
+                elif sn is not None:
+                    validation.has_inverters = True
+                    validation.inverter_sn = sn
+                    validation.inverter_type = inv_type
+                    validation.status = 'valid'
+                    logger.info(f"Valid inverter found for {site_name} - SN: {sn}, Type: {validation.inverter_type}")
             else:
                 logger.warning(f"Site ID {site_id} ({site_name}) not found in available sites")
             
@@ -73,4 +103,4 @@ class SiteValidator:
         
         valid_count = sum(1 for v in results.values() if v.status == 'valid')
         logger.info(f"Validation complete - Found {valid_count}/{len(results)} valid sites")
-        return results
\ No newline at end of file
+        return results